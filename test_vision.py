@@ -26,29 +26,94 @@ except ImportError:
 
 API_URL = "http://localhost:8000"
 
+# One keep-alive connection shared by every request in this script
+CLIENT = httpx.Client(base_url=API_URL)
+
+# Multiple of 3 so each chunk base64-encodes without padding
+ENCODE_CHUNK_SIZE = 48 * 1024
+
+MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+
+# Simple 1x1 red pixel PNG for testing, encoded once at import
+# PNG header + IHDR + IDAT with red pixel + IEND
+RED_PIXEL_PNG = (
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01'
+    b'\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde\x00'
+    b'\x00\x00\x0cIDATx\x9cc\xf8\xcf\xc0\x00\x00\x03\x01'
+    b'\x01\x00\xc9\xfe\x92\xef\x00\x00\x00\x00IEND\xaeB`\x82'
+)
+RED_PIXEL_DATA_URL = (
+    "data:image/png;base64," + base64.b64encode(RED_PIXEL_PNG).decode("ascii")
+)
+
+TAROT_PROMPT = '''Identify this tarot card. Output ONLY valid JSON with this exact structure:
+{"name": "card name", "suit": "suit or Major Arcana", "rank": "number or name", "confidence": 0.0-1.0}'''
+
 
-def encode_image(image_path: Path) -> str:
-    """Encode image to base64."""
+def encode_data_url(image_path: Path, mime_type: str) -> str:
+    """Encode image as a base64 data URL, assembled in a single buffer."""
+    prefix = f"data:{mime_type};base64,".encode("ascii")
+    size = image_path.stat().st_size
+    out = bytearray(len(prefix) + (size + 2) // 3 * 4)
+    out[:len(prefix)] = prefix
+    pos = len(prefix)
     with open(image_path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
+        while chunk := f.read(ENCODE_CHUNK_SIZE):
+            encoded = base64.b64encode(chunk)
+            out[pos:pos + len(encoded)] = encoded
+            pos += len(encoded)
+    del out[pos:]
+    return out.decode("ascii")
 
 
 def get_image_mime(image_path: Path) -> str:
     """Get MIME type from extension."""
-    ext = image_path.suffix.lower()
+    return MIME_TYPES.get(image_path.suffix.lower(), "image/jpeg")
+
+
+def build_payload(image_url: str, prompt: str, max_tokens: int) -> dict:
+    """Build a single-image chat completion request."""
     return {
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".png": "image/png",
-        ".gif": "image/gif",
-        ".webp": "image/webp",
-    }.get(ext, "image/jpeg")
+        "model": "/model",
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "image_url", "image_url": {"url": image_url}},
+                    {"type": "text", "text": prompt},
+                ]
+            }
+        ],
+        "temperature": 0.1,
+        "max_tokens": max_tokens,
+    }
+
+
+def parse_json_response(content: str) -> dict:
+    """Parse model output as JSON, unwrapping a markdown code block if needed."""
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        if "```" not in content:
+            raise
+
+    # Handle markdown code blocks
+    start = content.find("```") + 3
+    end = content.find("```", start)
+    content = content[start:end] if end != -1 else content[start:]
+    return json.loads(content.removeprefix("json"))
 
 
 def test_health() -> bool:
     """Check if vLLM server is running."""
     try:
-        response = httpx.get(f"{API_URL}/v1/models", timeout=5.0)
+        response = CLIENT.get("/v1/models", timeout=5.0)
         if response.status_code == 200:
             models = response.json()
             print(f"Server healthy. Available models:")
@@ -65,40 +130,15 @@ def test_health() -> bool:
 
 def test_vision(image_path: Path) -> dict:
     """Send image to vision model for tarot card identification."""
-    b64_image = encode_image(image_path)
-    mime_type = get_image_mime(image_path)
-
-    prompt = '''Identify this tarot card. Output ONLY valid JSON with this exact structure:
-{"name": "card name", "suit": "suit or Major Arcana", "rank": "number or name", "confidence": 0.0-1.0}'''
+    data_url = encode_data_url(image_path, get_image_mime(image_path))
 
-    payload = {
-        "model": "/model",
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{mime_type};base64,{b64_image}"
-                        }
-                    },
-                    {
-                        "type": "text",
-                        "text": prompt
-                    }
-                ]
-            }
-        ],
-        "temperature": 0.1,
-        "max_tokens": 200
-    }
+    payload = build_payload(data_url, TAROT_PROMPT, max_tokens=200)
 
     print(f"\nSending image: {image_path}")
     print(f"Image size: {image_path.stat().st_size / 1024:.1f} KB")
 
-    response = httpx.post(
-        f"{API_URL}/v1/chat/completions",
+    response = CLIENT.post(
+        "/v1/chat/completions",
         json=payload,
         timeout=60.0
     )
@@ -109,14 +149,8 @@ def test_vision(image_path: Path) -> dict:
 
     print(f"\nRaw response:\n{content}")
 
-    # Try to parse as JSON
     try:
-        # Handle markdown code blocks
-        if "```" in content:
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        parsed = json.loads(content.strip())
+        parsed = parse_json_response(content)
         print(f"\nParsed JSON:\n{json.dumps(parsed, indent=2)}")
         return parsed
     except json.JSONDecodeError:
@@ -126,44 +160,17 @@ def test_vision(image_path: Path) -> dict:
 
 def test_simple_vision() -> bool:
     """Test vision capability with a simple describe request (no image needed)."""
-    # Create a simple 1x1 red pixel PNG for testing
-    # PNG header + IHDR + IDAT with red pixel + IEND
-    red_pixel_png = (
-        b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01'
-        b'\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde\x00'
-        b'\x00\x00\x0cIDATx\x9cc\xf8\xcf\xc0\x00\x00\x03\x01'
-        b'\x01\x00\xc9\xfe\x92\xef\x00\x00\x00\x00IEND\xaeB`\x82'
+    payload = build_payload(
+        RED_PIXEL_DATA_URL,
+        "What color is this image? Reply with just the color name.",
+        max_tokens=50,
     )
-    b64_image = base64.b64encode(red_pixel_png).decode("utf-8")
-
-    payload = {
-        "model": "/model",
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{b64_image}"
-                        }
-                    },
-                    {
-                        "type": "text",
-                        "text": "What color is this image? Reply with just the color name."
-                    }
-                ]
-            }
-        ],
-        "temperature": 0.1,
-        "max_tokens": 50
-    }
 
     print("\nTesting basic vision with red pixel...")
 
     try:
-        response = httpx.post(
-            f"{API_URL}/v1/chat/completions",
+        response = CLIENT.post(
+            "/v1/chat/completions",
             json=payload,
             timeout=60.0
         )
@@ -234,4 +241,5 @@ docker run --gpus all \\
 
 
 if __name__ == "__main__":
-    main()
+    with CLIENT:
+        main()